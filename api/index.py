@@ -1,125 +1,118 @@
 
 from http.server import BaseHTTPRequestHandler
-import json
-import cloudinary
-import cloudinary.uploader
 import os
-import tempfile
-import base64
-
-# Configure Cloudinary
-cloudinary.config(
-    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.getenv("CLOUDINARY_API_KEY"),
-    api_secret=os.getenv("CLOUDINARY_API_SECRET")
-)
-
-def generate_embed_code(mp4_url, webm_url, poster_url):
-    return f"""<!-- Cinematic Landing Page Video -->
-<div class="cinematic-hero" style="position: relative; width: 100%; height: 100vh; overflow: hidden;">
-  <video 
-    style="position: absolute; top: 50%; left: 50%; min-width: 100%; min-height: 100%; width: auto; height: auto; transform: translate(-50%, -50%); object-fit: cover; z-index: -1;"
-    autoplay muted loop playsinline preload="auto" poster="{poster_url}">
-    <source src="{webm_url}" type="video/webm">
-    <source src="{mp4_url}" type="video/mp4">
-  </video>
-  <div style="position: relative; z-index: 1; padding: 2rem; color: white; text-align: center; display: flex; flex-direction: column; justify-content: center; height: 100vh;">
-    <h1 style="font-size: 3rem; margin-bottom: 1rem;">Your Landing Page Headline</h1>
-    <p style="font-size: 1.2rem; margin-bottom: 2rem;">Replace with your content</p>
-    <button style="background: #007cba; color: white; border: none; padding: 1rem 2rem; border-radius: 5px;">Call to Action</button>
-  </div>
-</div>"""
+import sys
+import orjson
+from multipart import parse_form
+
+# Vercel runs this file directly; make the repo root importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cinematic import core
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        
         response = {
             "message": "Cinematic Video Optimizer API is running!",
             "status": "healthy"
         }
-        self.wfile.write(json.dumps(response).encode())
-        
+        self.send_json_response(response)
+
     def do_POST(self):
         try:
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            
-            # Parse JSON data
-            data = json.loads(post_data.decode('utf-8'))
-            
-            # Extract video file (base64)
-            video_file = data.get('videoFile', '')
-            project_name = data.get('projectName', 'untitled')
-            customer_email = data.get('customerEmail', 'anonymous')
-            
-            if not video_file:
-                self.send_error(400, "No video file provided")
+            # O(1) size check before touching the body; oversize uploads are
+            # rejected without reading or decoding anything
+            content_length = int(self.headers.get('Content-Length', 0))
+            if content_length > core.MAX_UPLOAD_BYTES:
+                self.send_error(413, "Upload too large")
                 return
-                
-            # Handle base64 encoded files
-            if video_file.startswith("data:"):
+
+            # Preferred path: multipart uploads stream straight off the socket
+            # into Cloudinary's chunked uploader with no base64 round-trip
+            content_type = self.headers.get('Content-Type', '')
+            if content_type.startswith('multipart/form-data'):
+                self.handle_multipart_upload(content_type)
+                return
+
+            post_data = self.rfile.read(content_length)
+
+            # Fast path: scan the raw bytes for the data URI instead of parsing
+            # the whole body as JSON, then decode it chunk by chunk
+            parsed = core.parse_raw_body(post_data)
+            if parsed is not None:
+                video_buffer, project_name, customer_email = parsed
+            else:
+                # Fallback: parse JSON normally (escaped values, non-standard
+                # payloads); orjson takes the raw bytes, skipping a full UTF-8
+                # decode pass
+                data = orjson.loads(post_data)
+
+                video_file = data.get('videoFile', '')
+                project_name = data.get('projectName', 'untitled')
+                customer_email = data.get('customerEmail', 'anonymous')
+
+                if not video_file or not video_file.startswith("data:"):
+                    self.send_error(400, "No video file provided")
+                    return
+
                 header, encoded = video_file.split(",", 1)
-                video_content = base64.b64decode(encoded)
-                
-                # Create temporary file
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as temp_file:
-                    temp_file.write(video_content)
-                    temp_file_path = temp_file.name
-                
-                # Upload to Cloudinary
-                upload_result = cloudinary.uploader.upload(
-                    temp_file_path,
-                    resource_type="video",
-                    public_id=f"cinematic-{project_name.lower().replace(' ', '-')}",
-                    overwrite=True,
-                    eager=[
-                        {"format": "mp4", "quality": "auto:eco", "width": 1280, "height": 720},
-                        {"format": "webm", "quality": "auto:eco", "width": 1280, "height": 720}
-                    ],
-                    eager_async=False
-                )
-                
-                # Clean up
-                os.unlink(temp_file_path)
-                
-                # Extract URLs
-                original_url = upload_result['secure_url']
-                mp4_url = upload_result['eager'][0]['secure_url'] if upload_result['eager'] else original_url
-                webm_url = upload_result['eager'][1]['secure_url'] if len(upload_result['eager']) > 1 else original_url
-                
-                # Generate poster
-                poster_url = cloudinary.CloudinaryImage(upload_result['public_id']).build_url(
-                    resource_type="image",
-                    format="jpg",
-                    transformation=[{"width": 1280, "height": 720, "crop": "scale"}]
-                )
-                
-                embed_code = generate_embed_code(mp4_url, webm_url, poster_url)
-                
-                response_data = {
-                    "success": True,
-                    "message": "Video optimized successfully!",
-                    "optimizedFiles": {
-                        "mp4": {"url": mp4_url},
-                        "webm": {"url": webm_url},
-                        "poster": {"url": poster_url}
-                    },
-                    "embedCode": embed_code
-                }
-                
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                self.wfile.write(json.dumps(response_data).encode())
-                
+                video_buffer = core.decode_base64_str(encoded)
+
+            response_data = core.do_upload(video_buffer, project_name, customer_email)
+            self.send_json_response(response_data)
+
         except Exception as e:
             self.send_error(500, f"Error processing video: {str(e)}")
-            
+
+    def handle_multipart_upload(self, content_type):
+        # Parse the multipart body incrementally; the video part lands in a
+        # file-like object that the chunked uploader streams without buffering
+        fields = {}
+        files = {}
+
+        def on_field(field):
+            fields[field.field_name.decode()] = field.value.decode()
+
+        def on_file(part):
+            files[part.field_name.decode()] = part.file_object
+
+        parse_form(
+            {'Content-Type': content_type,
+             'Content-Length': self.headers.get('Content-Length')},
+            self.rfile, on_field, on_file
+        )
+
+        video_file = files.get('videoFile')
+        if video_file is None:
+            self.send_error(400, "No video file provided")
+            return
+
+        project_name = fields.get('projectName', 'untitled')
+        customer_email = fields.get('customerEmail', 'anonymous')
+
+        # Optional client-extracted poster frame, uploaded alongside the video
+        poster_file = files.get('posterFile')
+        if poster_file is not None:
+            poster_file.seek(0)
+
+        video_file.seek(0)
+        response_data = core.do_upload(
+            video_file, project_name, customer_email,
+            chunked=True, poster_file=poster_file
+        )
+        self.send_json_response(response_data)
+
+    def send_json_response(self, response_data):
+        # Serialize once so an explicit Content-Length can be sent; without
+        # it clients wait for connection close to know the body has ended
+        body = orjson.dumps(response_data)
+        self.send_response(200)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+
     def do_OPTIONS(self):
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
@@ -0,0 +1,300 @@
+
+# Shared upload/transform logic for both entrypoints (api/index.py and
+# main.py) so optimizations land once instead of drifting between copies
+import os
+import io
+import binascii
+import functools
+import hashlib
+import re
+import string
+from concurrent.futures import ThreadPoolExecutor
+import pybase64
+import cloudinary
+import cloudinary.uploader
+import cloudinary.utils
+
+# Configure Cloudinary
+cloudinary.config(
+    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
+    api_key=os.getenv("CLOUDINARY_API_KEY"),
+    api_secret=os.getenv("CLOUDINARY_API_SECRET")
+)
+
+# Widen the SDK's connection pool so keepalive connections to
+# api.cloudinary.com are reused across requests on a warm instance; the
+# default pool holds a single connection per host
+cloudinary.uploader._http = cloudinary.utils.get_http_connector(
+    cloudinary.config(),
+    dict(cloudinary.uploader._http.connection_pool_kw, num_pools=4, maxsize=16)
+)
+
+def _fast_sha1(data=b''):
+    # URL signing uses SHA-1 for cache-busting, not security;
+    # usedforsecurity=False keeps OpenSSL's hardware-accelerated digest on
+    # FIPS-restricted builds instead of a slow fallback
+    return hashlib.sha1(data, usedforsecurity=False)
+
+try:
+    _fast_sha1()
+    cloudinary.utils.signature_algorithms[
+        getattr(cloudinary.utils, 'SIGNATURE_SHA1', 'sha1')] = _fast_sha1
+except (AttributeError, TypeError, ValueError):
+    # Older interpreters/SDKs without the kwarg or the algorithm table keep
+    # the stock constructor
+    pass
+
+# Decode base64 in fixed slices (multiple of 4 chars) so only one slice's worth
+# of decoded bytes is held in memory at a time
+BASE64_CHUNK_SIZE = 1024 * 1024
+
+# Request-body ceiling enforced from the Content-Length header, before any
+# read or decode; oversize payloads would otherwise burn CPU decoding and
+# then OOM the 1 GB function
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 100 * 1024 * 1024))
+
+# Precompiled byte-level patterns: one linear scan over the raw body instead
+# of a full JSON tokenization pass just to pull out three fields
+_VIDEO_FILE_RE = re.compile(rb'"videoFile"\s*:\s*"data:[^";]*;base64,')
+_FIELD_RES = {
+    b'projectName': re.compile(rb'"projectName"\s*:\s*"([^"\\]*)"'),
+    b'customerEmail': re.compile(rb'"customerEmail"\s*:\s*"([^"\\]*)"'),
+}
+_FIELD_KEY_RES = {
+    b'projectName': re.compile(rb'"projectName"\s*:'),
+    b'customerEmail': re.compile(rb'"customerEmail"\s*:'),
+}
+
+# Sentinel returned by extract_string_field when a field's key is present but
+# its value contains escape sequences the clean-value regex cannot capture;
+# callers must fall back to a real JSON parse rather than use the default
+UNPARSEABLE = object()
+
+# Chunk size for Cloudinary's resumable upload of multipart files
+UPLOAD_LARGE_CHUNK_SIZE = 20_000_000
+
+# Pool for overlapping the poster upload with the video upload
+_upload_pool = ThreadPoolExecutor(max_workers=4)
+
+# Single transform spec shared by the eager request and local URL building
+EAGER_TRANSFORMATION = {"quality": "auto:eco", "width": 1280, "height": 720}
+
+def find_base64_span(post_data):
+    # Locate the base64 payload of the videoFile data URI in the raw body
+    match = _VIDEO_FILE_RE.search(post_data)
+    if match is None:
+        return None
+    payload_start = match.end()
+    payload_end = post_data.find(b'"', payload_start)
+    if payload_end == -1:
+        return None
+    return payload_start, payload_end
+
+def extract_string_field(post_data, name, default):
+    # Pull a short string field out of the raw body without parsing the JSON.
+    # A key that is present but whose value the clean pattern cannot capture
+    # (escape sequences, e.g. ensure_ascii output like 'Café') yields
+    # UNPARSEABLE so the caller runs a real JSON parse instead of silently
+    # substituting the default
+    pattern = _FIELD_RES.get(name)
+    key_pattern = _FIELD_KEY_RES.get(name)
+    if pattern is None:
+        pattern = re.compile(rb'"' + re.escape(name) + rb'"\s*:\s*"([^"\\]*)"')
+        key_pattern = re.compile(rb'"' + re.escape(name) + rb'"\s*:')
+    match = pattern.search(post_data)
+    if match is not None:
+        return match.group(1).decode('utf-8', errors='replace')
+    if key_pattern.search(post_data) is not None:
+        return UNPARSEABLE
+    return default
+
+def decode_base64_to_file(post_data, start, end, out_file):
+    # Stream the decode so we never hold the full decoded video in memory;
+    # the payload between the markers is clean base64, so validate=True keeps
+    # pybase64 on its vectorized path
+    for offset in range(start, end, BASE64_CHUNK_SIZE):
+        chunk = post_data[offset:min(offset + BASE64_CHUNK_SIZE, end)]
+        out_file.write(pybase64.b64decode(chunk, validate=True))
+
+def decode_data_uri(post_data, span):
+    # Decode the data URI payload located by find_base64_span into a buffer
+    # the Cloudinary uploader can stream from
+    video_buffer = io.BytesIO()
+    decode_base64_to_file(post_data, span[0], span[1], video_buffer)
+    video_buffer.seek(0)
+    return video_buffer
+
+def parse_raw_body(post_data):
+    # Fast path over the raw bytes of a JSON body. Returns (video_buffer,
+    # project_name, customer_email), or None when the body needs a real JSON
+    # parse — the fast path is an optimization only and must never fail a
+    # request the fallback would have handled
+    span = find_base64_span(post_data)
+    if span is None:
+        return None
+
+    project_name = extract_string_field(post_data, b'projectName', 'untitled')
+    customer_email = extract_string_field(post_data, b'customerEmail', 'anonymous')
+    if project_name is UNPARSEABLE or customer_email is UNPARSEABLE:
+        return None
+
+    try:
+        video_buffer = decode_data_uri(post_data, span)
+    except binascii.Error:
+        # Some encoders escape characters inside the payload (PHP's
+        # json_encode turns '/' into '\/'), which the strict chunked decoder
+        # rejects; the JSON parse + tolerant decode handles those bodies
+        return None
+
+    return video_buffer, project_name, customer_email
+
+def decode_base64_str(encoded):
+    # Fallback decode for payloads that arrived through a JSON parser;
+    # validate=False matches the stdlib's tolerance of stray characters
+    return io.BytesIO(pybase64.b64decode(encoded, validate=False))
+
+# Single C-level pass lowercasing the name and mapping separators that are
+# unsafe in a Cloudinary public_id to '-'; replaces .lower().replace(' ', '-')
+# which walked the string twice
+_PID_TABLE = str.maketrans(
+    {c: '-' for c in ' _/\\'} | {c: c.lower() for c in string.ascii_uppercase}
+)
+
+def project_slug(project_name):
+    return project_name.translate(_PID_TABLE)
+
+def customer_tag(customer_email):
+    # Stable per-customer suffix; built-in hash() is salted per process, which
+    # would change the public_id every deploy and defeat overwrite=True
+    digest = hashlib.blake2b(customer_email.encode(), digest_size=4).digest()
+    return int.from_bytes(digest, 'big') % 10000
+
+def upload_options(project_name, customer_email):
+    # Base options for the initial byte upload; the eager transforms are
+    # requested afterwards as separate explicit calls so Cloudinary can
+    # schedule them on parallel transcoder workers
+    return {
+        "resource_type": "video",
+        "public_id": f"cinematic-{project_slug(project_name)}-{customer_tag(customer_email):04d}",
+        "overwrite": True
+    }
+
+def request_eager_transform(public_id, fmt):
+    # One transform per explicit call; a single eager list can be serialized
+    # on the same worker. eager_async=True just enqueues the job, so the
+    # call returns without waiting for the transcode
+    return cloudinary.uploader.explicit(
+        public_id,
+        type="upload",
+        resource_type="video",
+        eager=[dict(EAGER_TRANSFORMATION, format=fmt)],
+        eager_async=True
+    )
+
+@functools.lru_cache(maxsize=2048)
+def eager_url(public_id, fmt):
+    # The eager transform URL is deterministic, so build it locally rather
+    # than waiting for the transcode result to come back in the response;
+    # cached since URL building runs string assembly per call
+    return cloudinary.CloudinaryVideo(public_id).build_url(
+        format=fmt,
+        transformation=[EAGER_TRANSFORMATION],
+        secure=True
+    )
+
+@functools.lru_cache(maxsize=2048)
+def poster_url(public_id):
+    # Deterministic per asset; caching skips the signing/assembly work when
+    # the same video is re-uploaded with overwrite=True
+    return cloudinary.CloudinaryImage(public_id).build_url(
+        resource_type="image",
+        format="jpg",
+        transformation=[{"width": 1280, "height": 720, "crop": "scale"}],
+        secure=True
+    )
+
+# Built once at import; formatted per request instead of re-parsing an f-string
+EMBED_TEMPLATE = """<!-- Cinematic Landing Page Video -->
+<div class="cinematic-hero" style="position: relative; width: 100%; height: 100vh; overflow: hidden;">
+  <video
+    style="position: absolute; top: 50%; left: 50%; min-width: 100%; min-height: 100%; width: auto; height: auto; transform: translate(-50%, -50%); object-fit: cover; z-index: -1;"
+    autoplay muted loop playsinline preload="auto" poster="{poster_url}">
+    <source src="{webm_url}" type="video/webm">
+    <source src="{mp4_url}" type="video/mp4">
+  </video>
+  <div style="position: relative; z-index: 1; padding: 2rem; color: white; text-align: center; display: flex; flex-direction: column; justify-content: center; height: 100vh;">
+    <h1 style="font-size: 3rem; margin-bottom: 1rem;">Your Landing Page Headline</h1>
+    <p style="font-size: 1.2rem; margin-bottom: 2rem;">Replace with your content</p>
+    <button style="background: #007cba; color: white; border: none; padding: 1rem 2rem; border-radius: 5px;">Call to Action</button>
+  </div>
+</div>"""
+
+def generate_embed_code(mp4_url, webm_url, poster_url):
+    return EMBED_TEMPLATE.format_map({
+        "mp4_url": mp4_url,
+        "webm_url": webm_url,
+        "poster_url": poster_url
+    })
+
+def build_response(upload_result, poster=None):
+    # Build the transform URLs locally; with eager_async the upload response
+    # comes back before the transcodes finish. A client-supplied poster asset
+    # takes priority over the derived video frame
+    mp4_url = eager_url(upload_result['public_id'], "mp4")
+    webm_url = eager_url(upload_result['public_id'], "webm")
+    jpg_url = poster if poster is not None else poster_url(upload_result['public_id'])
+
+    embed_code = generate_embed_code(mp4_url, webm_url, jpg_url)
+
+    return {
+        "success": True,
+        "message": "Video optimized successfully!",
+        "optimizedFiles": {
+            "mp4": {"url": mp4_url},
+            "webm": {"url": webm_url},
+            "poster": {"url": jpg_url}
+        },
+        "embedCode": embed_code
+    }
+
+def do_upload(file_obj, project_name, customer_email, chunked=False, poster_file=None):
+    # Upload a file-like object to Cloudinary and build the client response.
+    # chunked=True uses the resumable upload for multipart files of unknown
+    # size; the in-memory base64 paths use the plain streaming upload.
+    # A client-extracted poster frame, when supplied, is uploaded as a plain
+    # image asset in parallel with the video, skipping the video-to-jpg
+    # derivation in Cloudinary's transcoder
+    options = upload_options(project_name, customer_email)
+
+    poster_future = None
+    if poster_file is not None:
+        poster_future = _upload_pool.submit(
+            cloudinary.uploader.upload,
+            poster_file,
+            resource_type="image",
+            public_id=f"{options['public_id']}-poster",
+            overwrite=True
+        )
+
+    if chunked:
+        upload_result = cloudinary.uploader.upload_large(
+            file_obj,
+            chunk_size=UPLOAD_LARGE_CHUNK_SIZE,
+            **options
+        )
+    else:
+        upload_result = cloudinary.uploader.upload(file_obj, **options)
+
+    # Kick off the mp4 and webm transcodes in parallel on Cloudinary's side
+    eager_futures = [
+        _upload_pool.submit(request_eager_transform, upload_result['public_id'], fmt)
+        for fmt in ("mp4", "webm")
+    ]
+    for future in eager_futures:
+        future.result()
+
+    poster = poster_future.result()['secure_url'] if poster_future is not None else None
+
+    # No cleanup step here: callers hand in in-memory buffers or parser-owned
+    # spooled files, so there is no temp path left to unlink after the upload
+    return build_response(upload_result, poster=poster)
@@ -0,0 +1,85 @@
+
+from typing import Optional
+
+import orjson
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from starlette.concurrency import run_in_threadpool
+
+from cinematic import core
+
+app = FastAPI(title="Cinematic Video Optimizer", default_response_class=ORJSONResponse)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_methods=["GET", "POST", "OPTIONS"],
+    allow_headers=["Content-Type"],
+)
+
+@app.get("/")
+def health():
+    return {
+        "message": "Cinematic Video Optimizer API is running!",
+        "status": "healthy"
+    }
+
+def _check_upload_size(num_bytes):
+    # O(1) ceiling enforced before any read or decode work
+    if num_bytes is not None and num_bytes > core.MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Upload too large")
+
+@app.post("/api/optimize")
+async def optimize_video(
+    videoFile: UploadFile = File(...),
+    posterFile: Optional[UploadFile] = File(None),
+    projectName: str = Form("untitled"),
+    customerEmail: str = Form("anonymous"),
+):
+    # Multipart path: the spooled upload file goes straight to Cloudinary's
+    # chunked uploader; run_in_threadpool keeps the blocking SDK call off
+    # the event loop. An optional client-extracted poster frame is uploaded
+    # in parallel with the video
+    _check_upload_size(videoFile.size)
+    try:
+        return await run_in_threadpool(
+            core.do_upload, videoFile.file, projectName, customerEmail,
+            True, posterFile.file if posterFile is not None else None
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing video: {str(e)}")
+
+@app.post("/api/optimize-from-url")
+async def optimize_video_from_url(request: Request):
+    # Legacy JSON body with a base64 data URI; scan the raw bytes instead of
+    # parsing the whole payload as JSON where possible
+    _check_upload_size(int(request.headers.get('content-length', 0)))
+    post_data = await request.body()
+
+    parsed = core.parse_raw_body(post_data)
+    if parsed is not None:
+        video_buffer, project_name, customer_email = parsed
+    else:
+        # Fallback: parse JSON normally (escaped values, non-standard
+        # payloads)
+        try:
+            data = orjson.loads(post_data)
+        except orjson.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="No video file provided")
+
+        video_file = data.get('videoFile', '')
+        project_name = data.get('projectName', 'untitled')
+        customer_email = data.get('customerEmail', 'anonymous')
+
+        if not video_file or not video_file.startswith("data:"):
+            raise HTTPException(status_code=400, detail="No video file provided")
+
+        video_buffer = core.decode_base64_str(video_file.split(",", 1)[1])
+
+    try:
+        return await run_in_threadpool(
+            core.do_upload, video_buffer, project_name, customer_email
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing video: {str(e)}")